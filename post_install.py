@@ -1,6 +1,9 @@
 #!/usr/bin/env python3
 """Post-installation stuff - anything i can't do via a file copy"""
-from utils import Platform, run_cmd
+import shutil
+import subprocess
+
+from utils import CLOSE_FDS, Platform, run_cmd
 
 
 def main():
@@ -8,36 +11,67 @@ def main():
     print(f"Platform: {platform.value}")
 
     if platform == Platform.WINDOWS:
-        commands = [
-            ("clink autorun", "clink autorun install --allusers"),
-            ("clink theme", r"clink set ohmyposh.theme ~\zsh-ish.omp.json"),
+        media_keys_shortcut = (
+            "$WshShell = New-Object -ComObject WScript.Shell; "
+            "$shortcut = $WshShell.CreateShortcut("
+            '"$env:APPDATA\\Microsoft\\Windows\\Start Menu\\Programs\\Startup\\'
+            'Media Keys.lnk"); '
+            "$shortcut.TargetPath = "
+            '"$env:USERPROFILE\\Documents\\AutoHotkey\\Media Keys.ahk"; '
+            "$shortcut.Save()"
+        )
+        batch = [
+            ("clink autorun", ["clink", "autorun", "install", "--allusers"]),
+            ("clink theme", ["clink", "set", "ohmyposh.theme", r"~\zsh-ish.omp.json"]),
             (
                 "media keys startup",
-                r"powershell -Command \"$WshShell = New-Object -ComObject "
-                r"WScript.Shell; $shortcut = $WshShell.CreateShortcut("
-                r"\\\"$env:APPDATA\\Microsoft\\Windows\\Start Menu\\Programs\\"
-                r"Startup\\Media Keys.lnk\\\"); $shortcut.TargetPath = "
-                r"\\\"$env:USERPROFILE\\Documents\\AutoHotkey\\Media Keys.ahk"
-                r"\\\"; $shortcut.Save()\"",
+                ["powershell", "-NoProfile", "-Command", media_keys_shortcut],
             ),
-            ("fnm lts", "fnm install --lts"),
-            ("gh auth", "gh auth login"),
+            ("fnm lts", ["fnm", "install", "--lts"]),
+        ]
+        interactive = [
+            ("gh auth", ["gh", "auth", "login"]),
         ]
     else:
-        commands = [
-            ("fnm lts", "fnm install --lts"),
-            ("gh auth", "gh auth login"),
-            ("zsh default", "chsh -s $(which zsh)"),
+        batch = [
+            ("fnm lts", ["fnm", "install", "--lts"]),
+        ]
+        interactive = [
+            ("gh auth", ["gh", "auth", "login"]),
+            ("zsh default", ["chsh", "-s", shutil.which("zsh") or "zsh"]),
         ]
 
     print("\nRunning post-install commands...")
-    for name, cmd in commands:
-        print(f"  {name}...", end=" ")
-        success, _, stderr = run_cmd(cmd)
-        if success:
-            print("OK")
+
+    # Non-interactive commands don't depend on each other, so start them all
+    # at once and report in order once they're done
+    started: list[tuple[str, subprocess.Popen[str] | None, str]] = []
+    for name, cmd in batch:
+        try:
+            proc = subprocess.Popen(
+                [shutil.which(cmd[0]) or cmd[0], *cmd[1:]],
+                stdout=subprocess.DEVNULL,
+                stderr=subprocess.PIPE,
+                text=True,
+                close_fds=CLOSE_FDS,
+            )
+            started.append((name, proc, ""))
+        except OSError as e:
+            started.append((name, None, str(e)))
+
+    for name, proc, stderr in started:
+        if proc is not None:
+            _, stderr = proc.communicate()
+        if proc is not None and proc.returncode == 0:
+            print(f"  {name}... OK")
         else:
-            print(f"SKIP ({stderr[:30] if stderr else 'failed'})")
+            print(f"  {name}... SKIP ({stderr[:30] if stderr else 'failed'})")
+
+    # Interactive commands need the terminal, so run them one at a time
+    for name, cmd in interactive:
+        print(f"  {name}...", end=" ", flush=True)
+        success, _, _ = run_cmd(cmd, capture=False)
+        print("OK" if success else "SKIP (failed)")
 
     print("\nDone!")
 
@@ -4,165 +4,628 @@
 from __future__ import annotations
 
 import argparse
+import errno
+import hashlib
+import json
+import os
+import pickle
+import re
 import shutil
+import subprocess
 import sys
+import threading
 import time
+import unicodedata
+from collections.abc import Collection, Iterable, Iterator, Sequence
+from concurrent.futures import Future, ThreadPoolExecutor, as_completed
 from dataclasses import dataclass, field
 from pathlib import Path
+from typing import ClassVar
 
 from rich.console import Console
-from rich.panel import Panel
-from rich.table import Table
 
-from utils import PackageManager, Platform, run_cmd
+from utils import CLOSE_FDS, PackageManager, Platform, run_cmd, stream_cmd
 
-# For Python 3.11+, use tomllib. For older versions, fall back to tomli
-try:
-    import tomllib
-except ImportError:
-    try:
-        import tomli as tomllib
-    except ImportError:
-        print("Please install tomli for Python < 3.11: pip install tomli")
-        sys.exit(1)
+# The rest of rich and tomllib are imported where they're used, so short
+# invocations (--help, warm-cache runs) don't pay for them
 
 
 # =============================================================================
 # Package Manager Protocol & Implementations
 # =============================================================================
-@dataclass
+# Installed package lists are cached on disk, keyed by the mtimes of whatever
+# the package manager touches on install/uninstall
+CACHE_DIR = Path.home() / ".cache" / "devsetup"
+_INSTALLED_CACHE_VERSION = 3
+
+# Bump whenever Config, Package or FileMapping change shape
+_CONFIG_CACHE_VERSION = 4
+
+
+def _mtime_ns(path: Path) -> int:
+    """Return the mtime of a path, or 0 if it doesn't exist."""
+    try:
+        return path.stat().st_mtime_ns
+    except OSError:
+        return 0
+
+
+def _read_installed_cache(
+    manager: str, key: Sequence[int | str] | None
+) -> frozenset[str] | None:
+    """Load a cached installed-package set if it was stored under `key`."""
+    if key is None:
+        return None
+    try:
+        with open(CACHE_DIR / f"installed-{manager}.json") as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if data.get("version") != _INSTALLED_CACHE_VERSION or data.get("key") != list(key):
+        return None
+    return frozenset(data.get("packages", []))
+
+
+def _write_installed_cache(
+    manager: str, key: Sequence[int | str] | None, packages: frozenset[str]
+) -> None:
+    """Atomically store an installed-package set under `key`."""
+    if key is None:
+        return
+    path = CACHE_DIR / f"installed-{manager}.json"
+    tmp = path.with_name(f"{path.name}.{os.getpid()}.tmp")
+    data = {
+        "version": _INSTALLED_CACHE_VERSION,
+        "key": list(key),
+        "packages": sorted(packages),
+    }
+    try:
+        CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        with open(tmp, "w") as f:
+            json.dump(data, f)
+        os.replace(tmp, path)
+    except OSError:
+        tmp.unlink(missing_ok=True)
+
+
+def _clear_installed_cache() -> None:
+    """Remove all cached installed-package sets."""
+    for path in CACHE_DIR.glob("installed-*.json"):
+        path.unlink(missing_ok=True)
+
+
+# winget's result when the package is installed and already up to date
+# (APPINSTALLER_CLI_ERROR_UPDATE_NOT_APPLICABLE, 0x8A15002B)
+_WINGET_NO_UPGRADE_RE = re.compile(
+    r"No available upgrade found|No newer package versions are available"
+)
+
+# Per-package lines in batched brew/apt install output. Patterns with several
+# groups have one per wording; whichever matched holds the package name
+_BREW_CURRENT_RE = re.compile(
+    r"^Warning: (?:"
+    r"Cask '([^']+)' is already installed"  # casks, older brew
+    r"|Not upgrading (\S+), the latest version is already installed"  # casks
+    r"|(\S+) \S+ is already installed"  # formulae: "<name> <version> is ..."
+    r")",
+    re.M,
+)
+_BREW_MISSING_RE = re.compile(
+    r'No available formula with the name "([^"]+)"'
+    r'|No formulae or casks found for "?([^"\s]+?)"?\.?(?=\s|$)',
+    re.M,
+)
+_APT_CURRENT_RE = re.compile(r"^(\S+) is already the newest version", re.M)
+_APT_MISSING_RE = re.compile(
+    r"^E: (?:Unable to locate package |Package ')([^'\s]+)", re.M
+)
+
+# Skip apt update if it last ran within this long. The stamp is touched after
+# each successful update (by update-notifier-common), and apt renames new indexes
+# into the lists directory. The index files themselves carry the mirror's
+# Last-Modified time, so they say nothing about when this machine refreshed
+_APT_UPDATE_MARKERS = (
+    Path("/var/lib/apt/periodic/update-success-stamp"),
+    Path("/var/lib/apt/lists"),
+)
+_APT_LISTS_MAX_AGE = 24 * 60 * 60
+
+_UNINSTALL_KEY = r"SOFTWARE\Microsoft\Windows\CurrentVersion\Uninstall"
+_UNINSTALL_KEY_WOW64 = (
+    r"SOFTWARE\WOW6432Node\Microsoft\Windows\CurrentVersion\Uninstall"
+)
+# MSIX/AppX packages (e.g. Windows Terminal) are registered here instead
+_APPX_PACKAGES_KEY = (
+    r"Software\Classes\Local Settings\Software\Microsoft\Windows"
+    r"\CurrentVersion\AppModel\Repository\Packages"
+)
+
+
+def _add_installed(
+    installed: frozenset[str] | None, package_ids: Iterable[str]
+) -> frozenset[str] | None:
+    """Add freshly installed packages to a listing, if one was loaded."""
+    # Keep the listing current so later checks don't need a rescan
+    if installed is None:
+        return None
+    return installed | frozenset(pid.lower() for pid in package_ids)
+
+
+def _matched_names(pattern: re.Pattern[str], text: str) -> Iterator[str]:
+    """Yield the package name from each match, whichever group captured it."""
+    for match in pattern.finditer(text):
+        yield next(group for group in match.groups() if group)
+
+
+def _install_batch(
+    argv_prefix: list[str],
+    package_ids: list[str],
+    current_re: re.Pattern[str],
+    missing_re: re.Pattern[str],
+    use_stdout: bool,
+) -> tuple[dict[str, bool], list[str], set[str]]:
+    """Install packages with one command, dropping any the manager can't find.
+
+    Returns (results, pending, already_installed). `pending` lists packages whose
+    outcome is unknown because the batch failed without naming a culprit.
+    `current_re` finds already-installed packages (returned case-folded) in
+    stdout (`use_stdout`) or stderr; `missing_re` finds unknown ones in stderr.
+    """
+    results: dict[str, bool] = {}
+    already_installed: set[str] = set()
+    pending = list(package_ids)
+    while pending:
+        success, stdout, stderr = run_cmd([*argv_prefix, *pending])
+        current = _matched_names(current_re, stdout if use_stdout else stderr)
+        already_installed.update(pid.lower() for pid in current)
+        if success:
+            results.update(dict.fromkeys(pending, True))
+            return results, [], already_installed
+
+        # Package managers reject the whole batch over unknown packages, so
+        # drop those and retry the rest
+        unknown = {pid.lower() for pid in _matched_names(missing_re, stderr)}
+        missing = {pid for pid in pending if pid.lower() in unknown}
+        if not missing:
+            break
+        results.update(dict.fromkeys(missing, False))
+        pending = [pid for pid in pending if pid not in missing]
+    return results, pending, already_installed
+
+
+def _char_width(char: str) -> int:
+    """Get the number of terminal columns a character takes up."""
+    if unicodedata.combining(char):
+        return 0
+    return 2 if unicodedata.east_asian_width(char) in ("W", "F") else 1
+
+
+def _text_width(text: str) -> int:
+    """Get the number of terminal columns a string takes up."""
+    return sum(map(_char_width, text))
+
+
+def _slice_columns(line: str, start: int, end: int) -> str:
+    """Get the part of a line between terminal columns `start` and `end`."""
+    chars = []
+    column = 0
+    for char in line:
+        if column >= end:
+            break
+        if column >= start:
+            chars.append(char)
+        column += _char_width(char)
+    return "".join(chars)
+
+
+@dataclass(slots=True)
 class WingetManager:
     """Windows Package Manager (winget)."""
 
     name: str = "winget"
-    _installed_cache: set[str] | None = field(default=None, repr=False)
+    supports_batch_install: ClassVar[bool] = False
+    _available: bool | None = field(default=None, repr=False)
+    _installed_cache: frozenset[str] | None = field(default=None, repr=False)
+    _already_installed: set[str] = field(default_factory=set, repr=False)
+    _cache_lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
 
     def is_available(self) -> bool:
-        success, _, _ = run_cmd("winget --version")
-        return success
+        if self._available is None:
+            self._available = shutil.which(self.name) is not None
+        return self._available
+
+    def _cache_key(self) -> list[int] | None:
+        # Installs and uninstalls touch the registry Uninstall keys, or the
+        # AppX repository for MSIX packages
+        if sys.platform != "win32":
+            return None
 
-    def get_installed_packages(self) -> set[str]:
+        import winreg
+
+        key = []
+        for hive, subkey in (
+            (winreg.HKEY_LOCAL_MACHINE, _UNINSTALL_KEY),
+            (winreg.HKEY_LOCAL_MACHINE, _UNINSTALL_KEY_WOW64),
+            (winreg.HKEY_CURRENT_USER, _UNINSTALL_KEY),
+            (winreg.HKEY_CURRENT_USER, _APPX_PACKAGES_KEY),
+        ):
+            try:
+                with winreg.OpenKey(hive, subkey) as handle:
+                    key.append(winreg.QueryInfoKey(handle)[2])
+            except OSError:
+                key.append(0)
+        return key
+
+    def get_installed_packages(
+        self, wanted: Collection[str] | None = None
+    ) -> frozenset[str]:
+        # `winget list` can only filter by one query at a time, so list everything
         if self._installed_cache is not None:
             return self._installed_cache
 
-        success, stdout, _ = run_cmd("winget list --disable-interactivity")
-        if success:
-            self._installed_cache = {line.lower() for line in stdout.splitlines()}
-        else:
-            self._installed_cache = set()
+        cache_key = self._cache_key()
+        cached = _read_installed_cache(self.name, cache_key)
+        if cached is not None:
+            self._installed_cache = cached
+            return cached
+
+        # Parse rows as winget prints them instead of buffering the whole table
+        try:
+            lines = stream_cmd(["winget", "list", "--disable-interactivity"])
+            # The header row sits just above the "----" separator, after any
+            # progress spinner frames winget erased with \r
+            header = ""
+            for line in lines:
+                if line.startswith("---"):
+                    break
+                header = line.rsplit("\r", 1)[-1]
+            # Columns are fixed-width: Name, Id, Version, [Available], Source.
+            # Truncated names can end in "…" and a single space, so slice at the
+            # header's offsets instead of splitting on whitespace. winget pads
+            # by display width, so offsets are terminal columns, not characters
+            titles = [
+                _text_width(header[: m.start()]) for m in re.finditer(r"\S+", header)
+            ]
+            if len(titles) < 3:
+                raise ValueError(f"unexpected winget list header: {header!r}")
+            id_start, id_end = titles[1], titles[2]
+            self._installed_cache = frozenset(
+                package_id.lower()
+                for line in lines
+                if (package_id := _slice_columns(line, id_start, id_end).strip())
+            )
+        except (OSError, ValueError, subprocess.CalledProcessError):
+            self._installed_cache = frozenset()
+            return self._installed_cache
+
+        _write_installed_cache(self.name, cache_key, self._installed_cache)
         return self._installed_cache
 
     def is_installed(self, package_id: str) -> bool:
-        installed = self.get_installed_packages()
-        return any(package_id.lower() in line for line in installed)
+        # Installed sets are case-folded, as the managers treat IDs
+        return package_id.lower() in self.get_installed_packages()
 
     def install(
         self, package_id: str, arguments: str | None = None, dry_run: bool = False
     ) -> bool:
-        cmd = f"winget install {package_id} --accept-source-agreements --accept-package-agreements --silent"
-        if arguments:
-            cmd += f" {arguments}"
+        cmd = [
+            "winget",
+            "install",
+            package_id,
+            "--accept-source-agreements",
+            "--accept-package-agreements",
+            "--silent",
+        ]
 
         if dry_run:
             return True
 
-        success, _, _ = run_cmd(cmd)
+        # An installed package gets upgraded instead. winget exits non-zero when
+        # there's nothing to upgrade, which is fine here, but a failed upgrade
+        # is still a failure
+        success, stdout, _ = run_cmd(cmd, extra_args=arguments)
+        if _WINGET_NO_UPGRADE_RE.search(stdout):
+            self._already_installed.add(package_id.lower())
+            return True
+        if success:
+            # Installs run concurrently, so serialize updates to the listing
+            with self._cache_lock:
+                self._installed_cache = _add_installed(
+                    self._installed_cache, [package_id]
+                )
+                # Not every installer touches a registry key we watch, so store
+                # the updated listing rather than rely on the key changing
+                if self._installed_cache is not None:
+                    _write_installed_cache(
+                        self.name, self._cache_key(), self._installed_cache
+                    )
         return success
 
+    def install_many(
+        self, package_ids: list[str], dry_run: bool = False
+    ) -> dict[str, bool]:
+        # winget takes a single package per install
+        return {pid: self.install(pid, dry_run=dry_run) for pid in package_ids}
+
+    def was_already_installed(self, package_id: str) -> bool:
+        return package_id.lower() in self._already_installed
+
     def update_cache(self, dry_run: bool = False) -> None:
         # Winget doesn't need cache updates
         pass
 
 
-@dataclass
+@dataclass(slots=True)
 class BrewManager:
     """Homebrew Package Manager."""
 
     name: str = "brew"
-    _installed_cache: set[str] | None = field(default=None, repr=False)
+    supports_batch_install: ClassVar[bool] = True
+    _available: bool | None = field(default=None, repr=False)
+    _installed_cache: frozenset[str] | None = field(default=None, repr=False)
+    _already_installed: set[str] = field(default_factory=set, repr=False)
     _cache_updated: bool = field(default=False, repr=False)
+    _install_lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
 
     def is_available(self) -> bool:
-        success, _, _ = run_cmd("brew --version")
-        return success
+        if self._available is None:
+            self._available = shutil.which(self.name) is not None
+        return self._available
+
+    def _cache_key(self) -> list[int] | None:
+        # Formulae and casks each get a directory under the prefix
+        prefix = os.environ.get("HOMEBREW_PREFIX")
+        if not prefix:
+            brew = shutil.which("brew")
+            if not brew:
+                return None
+            # <prefix>/bin/brew is a symlink into the Homebrew repo on Linux and
+            # Intel macOS, so don't resolve it
+            prefix = str(Path(brew).parent.parent)
+        key = [
+            _mtime_ns(Path(prefix) / "Cellar"),
+            _mtime_ns(Path(prefix) / "Caskroom"),
+        ]
+        # Wrong prefix, nothing to invalidate the cache with
+        if not any(key):
+            return None
+        return key
 
-    def get_installed_packages(self) -> set[str]:
+    def get_installed_packages(
+        self, wanted: Collection[str] | None = None
+    ) -> frozenset[str]:
+        # `brew list <names>` lists files rather than filtering, so list everything
         if self._installed_cache is not None:
             return self._installed_cache
 
-        success, stdout, _ = run_cmd("brew list --formula -1 && brew list --cask -1")
-        if success:
-            self._installed_cache = {pkg.strip().lower() for pkg in stdout.splitlines()}
+        cache_key = self._cache_key()
+        cached = _read_installed_cache(self.name, cache_key)
+        if cached is not None:
+            self._installed_cache = cached
+            return cached
+
+        # Each `brew list` pays for a Ruby startup, so run both at once. An
+        # absolute path lets Popen use posix_spawn
+        brew = shutil.which(self.name) or self.name
+        try:
+            procs = [
+                subprocess.Popen(
+                    [brew, "list", kind, "-1"],
+                    stdout=subprocess.PIPE,
+                    stderr=subprocess.DEVNULL,
+                    text=True,
+                    close_fds=CLOSE_FDS,
+                )
+                for kind in ("--formula", "--cask")
+            ]
+        except OSError:
+            self._installed_cache = frozenset()
+            return self._installed_cache
+
+        outputs = [(proc.communicate()[0], proc.returncode) for proc in procs]
+        formula_ok = outputs[0][1] == 0
+
+        # Casks are optional (unsupported on Linux), formulae are not
+        if formula_ok:
+            self._installed_cache = frozenset(
+                pkg.strip().lower()
+                for stdout, returncode in outputs
+                if returncode == 0
+                for pkg in stdout.splitlines()
+            )
+            _write_installed_cache(self.name, cache_key, self._installed_cache)
         else:
-            self._installed_cache = set()
+            self._installed_cache = frozenset()
         return self._installed_cache
 
     def is_installed(self, package_id: str) -> bool:
+        # Installed sets are case-folded, as the managers treat IDs
         return package_id.lower() in self.get_installed_packages()
 
     def install(
         self, package_id: str, arguments: str | None = None, dry_run: bool = False
     ) -> bool:
-        cmd = f"brew install {package_id}"
-        if arguments:
-            cmd += f" {arguments}"
+        cmd = ["brew", "install", package_id]
 
         if dry_run:
             return True
 
-        success, _, _ = run_cmd(cmd)
+        # Concurrent brew processes fight over shared dependency kegs
+        with self._install_lock:
+            success, _, stderr = run_cmd(cmd, extra_args=arguments)
+            if success:
+                self._installed_cache = _add_installed(
+                    self._installed_cache, [package_id]
+                )
+        if success and "already installed" in stderr:
+            self._already_installed.add(package_id.lower())
         return success
 
+    def install_many(
+        self, package_ids: list[str], dry_run: bool = False
+    ) -> dict[str, bool]:
+        if dry_run or not package_ids:
+            return dict.fromkeys(package_ids, True)
+
+        with self._install_lock:
+            installed_before = self._installed_cache or frozenset()
+            results, pending, current = _install_batch(
+                ["brew", "install"],
+                package_ids,
+                _BREW_CURRENT_RE,
+                _BREW_MISSING_RE,
+                use_stdout=False,
+            )
+            self._already_installed.update(current)
+            self._installed_cache = _add_installed(
+                self._installed_cache, (pid for pid, ok in results.items() if ok)
+            )
+
+        # Couldn't tell which package broke the batch, so install one at a time.
+        # The failed batch may still have installed some of them, so only count
+        # a package as skipped if it was installed before the batch ran
+        installed_before |= current
+        for pid in pending:
+            results[pid] = self.install(pid)
+            if pid.lower() not in installed_before:
+                self._already_installed.discard(pid.lower())
+        return results
+
+    def was_already_installed(self, package_id: str) -> bool:
+        return package_id.lower() in self._already_installed
+
     def update_cache(self, dry_run: bool = False) -> None:
         if self._cache_updated or dry_run:
             return
-        run_cmd("brew update")
+        run_cmd(["brew", "update"])
         self._cache_updated = True
 
 
-@dataclass
+@dataclass(slots=True)
 class AptManager:
     """APT Package Manager (Debian/Ubuntu)."""
 
     name: str = "apt"
-    _installed_cache: set[str] | None = field(default=None, repr=False)
+    supports_batch_install: ClassVar[bool] = True
+    _available: bool | None = field(default=None, repr=False)
+    _installed_cache: frozenset[str] | None = field(default=None, repr=False)
+    _already_installed: set[str] = field(default_factory=set, repr=False)
     _cache_updated: bool = field(default=False, repr=False)
+    _install_lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
 
     def is_available(self) -> bool:
-        success, _, _ = run_cmd("apt --version")
-        return success
+        if self._available is None:
+            self._available = shutil.which(self.name) is not None
+        return self._available
+
+    def _cache_key(self, packages: list[str]) -> list[int | str] | None:
+        # dpkg rewrites its status database on every install/removal
+        return [_mtime_ns(Path("/var/lib/dpkg/status")), *packages]
 
-    def get_installed_packages(self) -> set[str]:
+    def get_installed_packages(
+        self, wanted: Collection[str] | None = None
+    ) -> frozenset[str]:
         if self._installed_cache is not None:
             return self._installed_cache
 
-        success, stdout, _ = run_cmd("dpkg-query -W -f='${Package}\\n'")
-        if success:
-            self._installed_cache = {pkg.strip().lower() for pkg in stdout.splitlines()}
-        else:
-            self._installed_cache = set()
+        # Only ask dpkg about the packages we care about, when we know them
+        packages = sorted(wanted) if wanted else []
+        cache_key = self._cache_key(packages)
+        cached = _read_installed_cache(self.name, cache_key)
+        if cached is not None:
+            self._installed_cache = cached
+            return cached
+
+        # Read rows as dpkg prints them instead of buffering the whole listing
+        installed: set[str] = set()
+        success = True
+        try:
+            for line in stream_cmd(
+                ["dpkg-query", "-W", "-f=${Package}\\t${Status}\\n", *packages]
+            ):
+                # Status is "<want> <flag> <state>", e.g. "hold ok installed"
+                name, _, status = line.partition("\t")
+                if status.split()[2:3] == ["installed"]:
+                    installed.add(name.strip().lower())
+        except (OSError, subprocess.CalledProcessError):
+            # Exits non-zero if any package is unknown, but still prints the rest
+            success = False
+
+        self._installed_cache = frozenset(installed)
+        if success or self._installed_cache:
+            _write_installed_cache(self.name, cache_key, self._installed_cache)
         return self._installed_cache
 
     def is_installed(self, package_id: str) -> bool:
+        # Installed sets are case-folded, as the managers treat IDs
         return package_id.lower() in self.get_installed_packages()
 
     def install(
         self, package_id: str, arguments: str | None = None, dry_run: bool = False
     ) -> bool:
-        cmd = f"sudo apt install -y {package_id}"
-        if arguments:
-            cmd += f" {arguments}"
+        cmd = ["sudo", "apt", "install", "-y", package_id]
 
         if dry_run:
             return True
 
-        success, _, _ = run_cmd(cmd)
+        # dpkg holds an exclusive lock, so only one apt install can run at a time
+        with self._install_lock:
+            success, stdout, _ = run_cmd(cmd, extra_args=arguments)
+            if success:
+                self._installed_cache = _add_installed(
+                    self._installed_cache, [package_id]
+                )
+        if success and "is already the newest version" in stdout:
+            self._already_installed.add(package_id.lower())
         return success
 
+    def install_many(
+        self, package_ids: list[str], dry_run: bool = False
+    ) -> dict[str, bool]:
+        if dry_run or not package_ids:
+            return dict.fromkeys(package_ids, True)
+
+        with self._install_lock:
+            installed_before = self._installed_cache or frozenset()
+            results, pending, current = _install_batch(
+                ["sudo", "apt", "install", "-y"],
+                package_ids,
+                _APT_CURRENT_RE,
+                _APT_MISSING_RE,
+                use_stdout=True,
+            )
+            self._already_installed.update(current)
+            self._installed_cache = _add_installed(
+                self._installed_cache, (pid for pid, ok in results.items() if ok)
+            )
+
+        # Couldn't tell which package broke the batch, so install one at a time.
+        # The failed batch may still have installed some of them, so only count
+        # a package as skipped if it was installed before the batch ran
+        installed_before |= current
+        for pid in pending:
+            results[pid] = self.install(pid)
+            if pid.lower() not in installed_before:
+                self._already_installed.discard(pid.lower())
+        return results
+
+    def was_already_installed(self, package_id: str) -> bool:
+        return package_id.lower() in self._already_installed
+
+    def _lists_are_fresh(self) -> bool:
+        """Check if apt's package indexes were refreshed recently."""
+        if os.environ.get("DEV_FORCE_APT_UPDATE") == "1":
+            return False
+        last_update = max(_mtime_ns(path) for path in _APT_UPDATE_MARKERS)
+        return time.time_ns() - last_update < _APT_LISTS_MAX_AGE * 1_000_000_000
+
     def update_cache(self, dry_run: bool = False) -> None:
         if self._cache_updated or dry_run:
             return
-        run_cmd("sudo apt update")
+        # apt update is a network round trip per source, skip it when the
+        # indexes are recent enough
+        if not self._lists_are_fresh():
+            run_cmd(["sudo", "apt", "update"])
         self._cache_updated = True
 
 
@@ -202,7 +665,7 @@ def get_package_manager(platform: Platform, console: Console) -> PackageManager
 # Configuration
 # =============================================================================
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class Package:
     """A package to install."""
 
@@ -227,7 +690,7 @@ class Package:
         return self.arguments.get(platform.value) or self.arguments.get("default")
 
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class FileMapping:
     """A file to copy."""
 
@@ -242,7 +705,7 @@ class FileMapping:
         return None
 
 
-@dataclass
+@dataclass(slots=True, frozen=True)
 class Config:
     """Configuration loaded from config.toml."""
 
@@ -250,13 +713,49 @@ class Config:
     files: list[FileMapping]
     meta: dict[str, str]
 
+    @staticmethod
+    def _cache_path(path: Path) -> Path:
+        """Get the pickle cache path for a config file."""
+        digest = hashlib.sha256(str(path.resolve()).encode()).hexdigest()[:16]
+        return CACHE_DIR / f"config-{digest}.pkl"
+
     @classmethod
     def load(cls, path: Path, console: Console) -> Config | None:
-        """Load configuration from a TOML file."""
+        """Load configuration from a TOML file.
+
+        The parsed config is pickled and reused until the file's mtime or size
+        changes.
+        """
         if not path.exists():
             console.print(f"[red]Error:[/red] {path} not found")
             return None
 
+        stat = path.stat()
+        header = (_CONFIG_CACHE_VERSION, stat.st_mtime_ns, stat.st_size)
+        cache_path = cls._cache_path(path)
+
+        try:
+            with open(cache_path, "rb") as f:
+                if pickle.load(f) == header:
+                    config = pickle.load(f)
+                    if isinstance(config, cls):
+                        return config
+        except Exception:
+            pass  # Missing or stale cache, parse from scratch
+
+        # For Python 3.11+, use tomllib. For older versions, fall back to tomli
+        try:
+            import tomllib
+        except ImportError:
+            try:
+                import tomli as tomllib
+            except ImportError:
+                console.print(
+                    "[red]Error:[/red] Please install tomli for Python < 3.11: "
+                    "pip install tomli"
+                )
+                return None
+
         try:
             with open(path, "rb") as f:
                 data = tomllib.load(f)
@@ -323,7 +822,19 @@ class Config:
                 destinations = {k: Path(v) for k, v in dest_data.items()}
                 files.append(FileMapping(source=source_path, destinations=destinations))
 
-        return cls(packages=packages, files=files, meta=meta)
+        config = cls(packages=packages, files=files, meta=meta)
+
+        tmp = cache_path.with_name(f"{cache_path.name}.{os.getpid()}.tmp")
+        try:
+            CACHE_DIR.mkdir(parents=True, exist_ok=True)
+            with open(tmp, "wb") as f:
+                pickle.dump(header, f, protocol=5)
+                pickle.dump(config, f, protocol=5)
+            os.replace(tmp, cache_path)
+        except (OSError, pickle.PicklingError):
+            tmp.unlink(missing_ok=True)
+
+        return config
 
 
 # =============================================================================
@@ -331,117 +842,308 @@ class Config:
 # =============================================================================
 
 
+def _sections_for(platform: Platform) -> list[str]:
+    """Get the package sections that apply to the platform, in install order."""
+    sections = ["common"]
+
+    if platform == Platform.WINDOWS:
+        sections.extend(["gui_only", "windows_only"])
+    elif platform.is_unix:
+        sections.append("unix_only")
+        if platform == Platform.WSL:
+            sections.append("wsl_only")
+        elif platform == Platform.MACOS:
+            sections.append("macos_only")
+
+    return sections
+
+
+def _iter_packages(
+    config: Config, platform: Platform, manager: PackageManager
+) -> Iterator[tuple[str, Package, str | None]]:
+    """Yield (section, package, package_id) for every package on the platform.
+
+    package_id is None for packages that have no ID for this platform/manager.
+    """
+    for section in _sections_for(platform):
+        for pkg in config.packages.get(section, []):
+            yield section, pkg, pkg.get_id(platform, manager)
+
+
+def _wanted_ids(
+    config: Config, platform: Platform, manager: PackageManager
+) -> set[str]:
+    """Get the IDs of every package that applies to the platform."""
+    return {
+        package_id
+        for _, _, package_id in _iter_packages(config, platform, manager)
+        if package_id
+    }
+
+
 def install_packages(
     config: Config,
     platform: Platform,
     manager: PackageManager,
     console: Console,
     dry_run: bool = False,
+    jobs: int = 1,
+    skip_precheck: bool = False,
 ) -> tuple[int, int, int]:
-    """Install packages. Returns (success_count, skip_count, fail_count)."""
+    """Install packages. Returns (success_count, skip_count, fail_count).
+
+    Missing packages are installed concurrently using up to `jobs` workers. With
+    `skip_precheck`, installed packages aren't listed up front; every package is
+    passed to the manager, which reports the ones that were already installed.
+    """
     success_count = 0
     skip_count = 0
     fail_count = 0
 
-    # Update package cache once
-    if not dry_run:
-        with console.status(f"Updating {manager.name} cache..."):
-            manager.update_cache(dry_run)
-
-    # Determine which sections to process
-    sections_to_process = ["common"]
-
-    if platform == Platform.WINDOWS:
-        sections_to_process.extend(["gui_only", "windows_only"])
-    elif platform.is_unix:
-        sections_to_process.append("unix_only")
-        if platform == Platform.WSL:
-            sections_to_process.append("wsl_only")
-        elif platform == Platform.MACOS:
-            sections_to_process.append("macos_only")
+    # Only list installed packages if there's anything to look up
+    wanted = _wanted_ids(config, platform, manager)
+    if wanted and not skip_precheck:
+        manager.get_installed_packages(wanted)
 
     # In dry-run mode, collect all results and display as table
     if dry_run:
+        from rich.table import Table
+
         table = Table(title="Packages")
         table.add_column("Package", style="cyan")
         table.add_column("Section", style="dim")
         table.add_column("Package ID", style="dim")
         table.add_column("Action")
 
-        for section in sections_to_process:
-            packages = config.packages.get(section, [])
-            for pkg in packages:
-                package_id = pkg.get_id(platform, manager)
-                if not package_id:
-                    table.add_row(pkg.name, section, "-", "[dim]SKIP (no ID)[/dim]")
-                    skip_count += 1
-                elif manager.is_installed(package_id):
-                    table.add_row(
-                        pkg.name,
-                        section,
-                        package_id,
-                        "[yellow]SKIP (installed)[/yellow]",
-                    )
-                    skip_count += 1
-                else:
-                    table.add_row(pkg.name, section, package_id, "[cyan]INSTALL[/cyan]")
-                    success_count += 1
+        for section, pkg, package_id in _iter_packages(config, platform, manager):
+            if not package_id:
+                table.add_row(pkg.name, section, "-", "[dim]SKIP (no ID)[/dim]")
+                skip_count += 1
+            elif not skip_precheck and manager.is_installed(package_id):
+                table.add_row(
+                    pkg.name, section, package_id, "[yellow]SKIP (installed)[/yellow]"
+                )
+                skip_count += 1
+            else:
+                table.add_row(pkg.name, section, package_id, "[cyan]INSTALL[/cyan]")
+                success_count += 1
 
         console.print()
         console.print(table)
         return success_count, skip_count, fail_count
 
-    # Normal mode: install packages with progress
-    for section in sections_to_process:
-        packages = config.packages.get(section, [])
-        if not packages:
-            continue
+    # Normal mode: find missing packages, then install them in parallel
+    console.print("\n[bold blue]Installing packages[/bold blue]")
 
-        console.print(f"\n[bold blue]Installing {section} packages[/bold blue]")
+    work: list[tuple[str, Package, str]] = []  # (section, package, package_id)
+    for section, pkg, package_id in _iter_packages(config, platform, manager):
+        if not package_id:
+            console.print(f"  [dim]SKIP[/dim] {pkg.name} (no ID for {platform.value})")
+            skip_count += 1
+        elif not skip_precheck and manager.is_installed(package_id):
+            console.print(f"  [yellow]SKIP[/yellow] {pkg.name} (already installed)")
+            skip_count += 1
+        else:
+            work.append((section, pkg, package_id))
 
-        for pkg in packages:
-            package_id = pkg.get_id(platform, manager)
-            if not package_id:
-                console.print(
-                    f"  [dim]SKIP[/dim] {pkg.name} (no ID for {platform.value})"
-                )
-                skip_count += 1
-                continue
+    if not work:
+        return success_count, skip_count, fail_count
 
-            # Check if already installed
-            if manager.is_installed(package_id):
-                console.print(f"  [yellow]SKIP[/yellow] {pkg.name} (already installed)")
-                skip_count += 1
-                continue
+    # A single progress bar tracks the cache update and the whole pool; results
+    # are only printed from this thread, as each install completes
+    from rich.progress import (
+        BarColumn,
+        MofNCompleteColumn,
+        Progress,
+        SpinnerColumn,
+        TextColumn,
+    )
 
-            # Install
+    progress = Progress(
+        SpinnerColumn(),
+        TextColumn("  {task.description}"),
+        BarColumn(),
+        MofNCompleteColumn(),
+        console=console,
+        transient=True,
+    )
+    with (
+        progress,
+        ThreadPoolExecutor(max_workers=max(1, min(jobs, len(work)))) as executor,
+    ):
+        # Update package cache once, and only when something needs installing
+        task = progress.add_task(f"Updating {manager.name} cache", total=len(work))
+        manager.update_cache(dry_run)
+        progress.update(task, description="Installing")
+
+        def install_one(package_id: str, arguments: str | None) -> dict[str, bool]:
+            return {package_id: manager.install(package_id, arguments, False)}
+
+        # Packages without custom arguments go through one batched call when the
+        # manager supports it; every future maps package_id -> success
+        batch: list[tuple[str, Package, str]] = []
+        single = work
+        if manager.supports_batch_install:
+            batch = [item for item in work if not item[1].get_arguments(platform)]
+            single = [item for item in work if item[1].get_arguments(platform)]
+
+        futures: dict[Future[dict[str, bool]], list[tuple[str, Package, str]]] = {}
+        if batch:
+            ids = [package_id for _, _, package_id in batch]
+            futures[executor.submit(manager.install_many, ids, False)] = batch
+        for item in single:
+            _, pkg, package_id = item
             arguments = pkg.get_arguments(platform)
-            with console.status(f"  Installing {pkg.name}..."):
-                success = manager.install(package_id, arguments, dry_run=False)
-
-            if success:
-                console.print(f"  [green]OK[/green] {pkg.name}")
-                success_count += 1
-            else:
-                console.print(f"  [red]FAIL[/red] {pkg.name}")
-                fail_count += 1
+            futures[executor.submit(install_one, package_id, arguments)] = [item]
+
+        for future in as_completed(futures):
+            results = future.result()
+            for section, pkg, package_id in futures[future]:
+                if not results.get(package_id, False):
+                    console.print(
+                        f"  [red]FAIL[/red] {pkg.name} [dim]({section})[/dim]"
+                    )
+                    fail_count += 1
+                elif manager.was_already_installed(package_id):
+                    console.print(
+                        f"  [yellow]SKIP[/yellow] {pkg.name} (already installed)"
+                    )
+                    skip_count += 1
+                else:
+                    console.print(
+                        f"  [green]OK[/green] {pkg.name} [dim]({section})[/dim]"
+                    )
+                    success_count += 1
+                progress.update(task, advance=1, description=f"Installed {pkg.name}")
 
     return success_count, skip_count, fail_count
 
 
+def _kernel_copy(source: Path, dest: Path) -> bool:
+    """Copy file contents with os.copy_file_range. Returns False if it can't."""
+    copy_file_range = getattr(os, "copy_file_range", None)  # Linux only
+    if copy_file_range is None:
+        return False
+
+    try:
+        with open(source, "rb") as src, open(dest, "wb") as dst:
+            remaining = os.fstat(src.fileno()).st_size
+            # procfs and similar report a size of 0 whatever they hold
+            if remaining == 0:
+                return False
+            while remaining > 0:
+                copied = copy_file_range(src.fileno(), dst.fileno(), remaining)
+                # Some filesystems (FUSE, 9p, overlay) return 0 instead of an
+                # error, otherwise the source shrank while we were copying
+                if copied == 0:
+                    return False
+                remaining -= copied
+    except OSError as e:
+        # Unsupported filesystem or kernel
+        if e.errno not in (errno.EXDEV, errno.ENOSYS, errno.EINVAL, errno.ENOTSUP):
+            raise
+        return False
+    return True
+
+
+def _fast_copy(source: Path, dest: Path) -> None:
+    """Copy a file and its metadata, letting the kernel move the bytes if it can."""
+    if dest.is_dir():
+        dest = dest / source.name
+
+    # Opening dest for writing truncates it, which would empty a dest that is
+    # a symlink or hard link to source
+    if dest.exists() and os.path.samefile(source, dest):
+        raise shutil.SameFileError(f"'{source}' and '{dest}' are the same file")
+
+    # Fall back to a regular copy, which truncates whatever the kernel wrote
+    if not _kernel_copy(source, dest):
+        shutil.copyfile(source, dest)
+
+    shutil.copystat(source, dest)
+
+
+def _is_up_to_date(source: Path, dest: Path) -> bool:
+    """Check if dest already holds a copy of source (same size and mtime)."""
+    if dest.is_dir():
+        dest = dest / source.name
+    try:
+        src_stat, dest_stat = source.stat(), dest.stat()
+    except OSError:
+        return False
+    # copystat carries the mtime over, so an unchanged source matches exactly;
+    # whole seconds allow for filesystems with coarser timestamps
+    same_size = src_stat.st_size == dest_stat.st_size
+    return same_size and int(src_stat.st_mtime) == int(dest_stat.st_mtime)
+
+
+def _copy_one(file_mapping: FileMapping, platform: Platform) -> tuple[str, str]:
+    """Copy a single file. Returns (status, message) with status ok/skip/fail."""
+    source = file_mapping.source
+    dest = file_mapping.get_destination(platform)
+
+    if not dest:
+        return (
+            "skip",
+            f"  [dim]SKIP[/dim] {source} (no destination for {platform.value})",
+        )
+
+    if not source.exists():
+        return "fail", f"  [red]FAIL[/red] {source} (source not found)"
+
+    if _is_up_to_date(source, dest):
+        return "skip", f"  [yellow]SKIP[/yellow] {source} (up to date)"
+
+    try:
+        # Destination directories were created up front by _copy_all
+        _fast_copy(source, dest)
+    except Exception as e:
+        return "fail", f"  [red]FAIL[/red] {source}: {e}"
+
+    return "ok", f"  [green]OK[/green] {source} -> {dest}"
+
+
+def _copy_all(config: Config, platform: Platform) -> list[tuple[str, str]]:
+    """Copy all files in parallel. Returns _copy_one results in config order."""
+    # Create each destination directory once, shallowest first, instead of
+    # once per file. Failures surface as copy errors in _copy_one
+    parents = {
+        dest.parent
+        for fm in config.files
+        if (dest := fm.get_destination(platform)) and fm.source.exists()
+    }
+    for parent in sorted(parents, key=lambda p: len(p.parts)):
+        try:
+            parent.mkdir(parents=True, exist_ok=True)
+        except OSError:
+            pass
+
+    # One worker per file, up to roughly what an SSD's queue can keep busy
+    workers = max(1, min(32, len(config.files)))
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(lambda fm: _copy_one(fm, platform), config.files))
+
+
 def copy_files(
     config: Config,
     platform: Platform,
     console: Console,
     dry_run: bool = False,
+    results: list[tuple[str, str]] | None = None,
 ) -> tuple[int, int, int]:
-    """Copy configuration files. Returns (success_count, skip_count, fail_count)."""
+    """Copy configuration files. Returns (success_count, skip_count, fail_count).
+
+    Pass `results` from an earlier _copy_all call to only report on copies that
+    already ran in the background.
+    """
     success_count = 0
     skip_count = 0
     fail_count = 0
 
     # In dry-run mode, collect all results and display as table
     if dry_run:
+        from rich.table import Table
+
         table = Table(title="Configuration Files")
         table.add_column("Source", style="cyan")
         table.add_column("Destination", style="dim")
@@ -459,6 +1161,11 @@ def copy_files(
                     str(source), str(dest), "[red]FAIL (source not found)[/red]"
                 )
                 fail_count += 1
+            elif _is_up_to_date(source, dest):
+                table.add_row(
+                    str(source), str(dest), "[yellow]SKIP (up to date)[/yellow]"
+                )
+                skip_count += 1
             else:
                 table.add_row(str(source), str(dest), "[cyan]COPY[/cyan]")
                 success_count += 1
@@ -467,33 +1174,19 @@ def copy_files(
         console.print(table)
         return success_count, skip_count, fail_count
 
-    # Normal mode: copy files with progress
+    # Normal mode: report in config order (copying may already have happened)
     console.print("\n[bold blue]Copying configuration files[/bold blue]")
 
-    for file_mapping in config.files:
-        source = file_mapping.source
-        dest = file_mapping.get_destination(platform)
-
-        if not dest:
-            console.print(
-                f"  [dim]SKIP[/dim] {source} (no destination for {platform.value})"
-            )
-            skip_count += 1
-            continue
-
-        if not source.exists():
-            console.print(f"  [red]FAIL[/red] {source} (source not found)")
-            fail_count += 1
-            continue
+    if results is None:
+        results = _copy_all(config, platform)
 
-        try:
-            # Ensure destination directory exists
-            dest.parent.mkdir(parents=True, exist_ok=True)
-            shutil.copy2(source, dest)
-            console.print(f"  [green]OK[/green] {source} -> {dest}")
+    for status, message in results:
+        console.print(message)
+        if status == "ok":
             success_count += 1
-        except Exception as e:
-            console.print(f"  [red]FAIL[/red] {source}: {e}")
+        elif status == "skip":
+            skip_count += 1
+        else:
             fail_count += 1
 
     return success_count, skip_count, fail_count
@@ -501,6 +1194,8 @@ def copy_files(
 
 def show_status(config: Config, platform: Platform, console: Console) -> None:
     """Show installation status."""
+    from rich.table import Table
+
     manager = get_package_manager(platform, console)
     if not manager:
         return
@@ -513,32 +1208,24 @@ def show_status(config: Config, platform: Platform, console: Console) -> None:
     installed_count = 0
     total_count = 0
 
-    for section, packages in config.packages.items():
-        # Skip irrelevant sections
-        if section == "gui_only" and platform != Platform.WINDOWS:
-            continue
-        if section == "windows_only" and platform != Platform.WINDOWS:
-            continue
-        if section == "unix_only" and not platform.is_unix:
-            continue
-        if section == "wsl_only" and platform != Platform.WSL:
-            continue
-        if section == "macos_only" and platform != Platform.MACOS:
-            continue
-
-        for pkg in packages:
-            package_id = pkg.get_id(platform, manager)
-            if not package_id:
-                continue
-
-            total_count += 1
-            if manager.is_installed(package_id):
-                status = "[green]✓ installed[/green]"
-                installed_count += 1
-            else:
-                status = "[red]✗ missing[/red]"
+    # Walk the packages once; _wanted_ids would be a second pass over them
+    packages = [
+        (section, pkg, package_id)
+        for section, pkg, package_id in _iter_packages(config, platform, manager)
+        if package_id
+    ]
+    if packages:
+        manager.get_installed_packages({package_id for _, _, package_id in packages})
+
+    for section, pkg, package_id in packages:
+        total_count += 1
+        if manager.is_installed(package_id):
+            status = "[green]✓ installed[/green]"
+            installed_count += 1
+        else:
+            status = "[red]✗ missing[/red]"
 
-            table.add_row(pkg.name, section, status)
+        table.add_row(pkg.name, section, status)
 
     console.print(table)
     console.print(f"\nSummary: {installed_count}/{total_count} packages installed")
@@ -549,8 +1236,19 @@ def show_status(config: Config, platform: Platform, console: Console) -> None:
 # =============================================================================
 
 
+def _default_jobs() -> int:
+    """Get the default number of parallel installs."""
+    try:
+        return int(os.environ["DEV_PARALLEL_INSTALLS"])
+    except (KeyError, ValueError):
+        return os.cpu_count() or 1
+
+
 def show_help(console: Console) -> None:
     """Display a nice help message using rich."""
+    from rich.panel import Panel
+    from rich.table import Table
+
     console.print(Panel.fit("[bold]Dev Environment Setup[/bold]", border_style="blue"))
     console.print()
     console.print(
@@ -579,6 +1277,15 @@ def show_help(console: Console) -> None:
     opt_table.add_row(
         "-c, --config", "Path to config file [dim](default: config.toml)[/dim]"
     )
+    opt_table.add_row(
+        "-j, --jobs",
+        "Parallel package installs "
+        "[dim](default: $DEV_PARALLEL_INSTALLS or CPU count)[/dim]",
+    )
+    opt_table.add_row("--refresh-cache", "Re-query installed packages")
+    opt_table.add_row(
+        "--skip-precheck", "Let the package manager skip installed packages"
+    )
     opt_table.add_row("-h, --help", "Show this help message")
 
     console.print("[bold]Options:[/bold]")
@@ -615,6 +1322,9 @@ def main() -> int:
     )
     parser.add_argument("--dry-run", "-n", action="store_true")
     parser.add_argument("--config", "-c", type=Path, default=Path("config.toml"))
+    parser.add_argument("--jobs", "-j", type=int, default=_default_jobs())
+    parser.add_argument("--refresh-cache", action="store_true")
+    parser.add_argument("--skip-precheck", action="store_true")
     parser.add_argument("--help", "-h", action="store_true")
 
     args = parser.parse_args()
@@ -623,6 +1333,8 @@ def main() -> int:
         show_help(console)
         return 0
 
+    from rich.panel import Panel
+
     # Header
     console.print(Panel.fit("[bold]Dev Environment Setup[/bold]", border_style="blue"))
 
@@ -642,6 +1354,9 @@ def main() -> int:
     if not config:
         return 2
 
+    if args.refresh_cache:
+        _clear_installed_cache()
+
     start_time = time.time()
 
     # Status command
@@ -661,19 +1376,37 @@ def main() -> int:
     total_skip = 0
     total_fail = 0
 
-    if args.command in ("all", "packages") and manager:
-        success, skip, fail = install_packages(
-            config, platform, manager, console, args.dry_run
-        )
-        total_success += success
-        total_skip += skip
-        total_fail += fail
-
-    if args.command in ("all", "files"):
-        success, skip, fail = copy_files(config, platform, console, args.dry_run)
-        total_success += success
-        total_skip += skip
-        total_fail += fail
+    with ThreadPoolExecutor(max_workers=1) as background:
+        # Copying doesn't depend on any package, so overlap it with installs
+        copying = None
+        if args.command == "all" and not args.dry_run:
+            copying = background.submit(_copy_all, config, platform)
+
+        if args.command in ("all", "packages") and manager:
+            success, skip, fail = install_packages(
+                config,
+                platform,
+                manager,
+                console,
+                args.dry_run,
+                args.jobs,
+                args.skip_precheck,
+            )
+            total_success += success
+            total_skip += skip
+            total_fail += fail
+
+        if args.command in ("all", "files"):
+            success, skip, fail = copy_files(
+                config,
+                platform,
+                console,
+                args.dry_run,
+                copying.result() if copying else None,
+            )
+            total_success += success
+            total_skip += skip
+            total_fail += fail
 
     # Summary
     elapsed = time.time() - start_time
@@ -0,0 +1,178 @@
+import unittest
+from unittest import mock
+
+import setup
+
+# Homebrew and apt output, one entry per message wording the parsers rely on
+BREW_CURRENT = [
+    (
+        "Warning: jq 1.7.1 is already installed and up-to-date.\n"
+        "To reinstall 1.7.1, run:\n"
+        "  brew reinstall jq\n",
+        ["jq"],
+    ),
+    (
+        "Warning: python@3.12 3.12.2_1 is already installed and up-to-date.\n",
+        ["python@3.12"],
+    ),
+    (
+        "Warning: Cask 'firefox' is already installed.\n\n"
+        "To re-install firefox, run:\n"
+        "  brew reinstall --cask firefox\n",
+        ["firefox"],
+    ),
+    (
+        "Warning: Not upgrading visual-studio-code, the latest version is "
+        "already installed\n",
+        ["visual-studio-code"],
+    ),
+    ("==> Fetching jq\n==> Pouring jq--1.7.1.arm64_sonoma.bottle.tar.gz\n", []),
+]
+BREW_MISSING = [
+    ('Error: No available formula with the name "jqq". Did you mean "jq"?\n', ["jqq"]),
+    (
+        'Warning: No available formula with the name "fdd". Did you mean fd?\n'
+        "==> Searching for similarly named formulae and casks...\n"
+        "Error: No formulae or casks found for fdd.\n",
+        ["fdd", "fdd"],
+    ),
+    ('Error: No formulae or casks found for "python@3.99".\n', ["python@3.99"]),
+    ("Error: No formulae or casks found for python@3.99.\n", ["python@3.99"]),
+]
+APT_CURRENT = [
+    ("jq is already the newest version (1.6-2.1ubuntu3).\n", ["jq"]),
+    (
+        "Reading package lists...\n"
+        "git is already the newest version (1:2.34.1-1ubuntu1.10).\n"
+        "0 upgraded, 0 newly installed, 0 to remove and 3 not upgraded.\n",
+        ["git"],
+    ),
+]
+APT_MISSING = [
+    ("E: Unable to locate package fdd\n", ["fdd"]),
+    ("E: Package 'python' has no installation candidate\n", ["python"]),
+    ("E: Sub-process /usr/bin/dpkg returned an error code (1)\n", []),
+]
+
+
+class OutputPatternTests(unittest.TestCase):
+    def check(self, pattern, cases) -> None:
+        for output, names in cases:
+            with self.subTest(output=output):
+                self.assertEqual(list(setup._matched_names(pattern, output)), names)
+
+    def test_brew_already_installed(self) -> None:
+        self.check(setup._BREW_CURRENT_RE, BREW_CURRENT)
+
+    def test_brew_missing(self) -> None:
+        self.check(setup._BREW_MISSING_RE, BREW_MISSING)
+
+    def test_apt_already_installed(self) -> None:
+        self.check(setup._APT_CURRENT_RE, APT_CURRENT)
+
+    def test_apt_missing(self) -> None:
+        self.check(setup._APT_MISSING_RE, APT_MISSING)
+
+
+class InstallBatchTests(unittest.TestCase):
+    def install_batch(self, outputs, package_ids, use_stdout=False):
+        with mock.patch.object(setup, "run_cmd", side_effect=outputs) as run_cmd:
+            result = setup._install_batch(
+                ["brew", "install"],
+                package_ids,
+                setup._BREW_CURRENT_RE,
+                setup._BREW_MISSING_RE,
+                use_stdout=use_stdout,
+            )
+        return result, [call.args[0] for call in run_cmd.call_args_list]
+
+    def test_success(self) -> None:
+        (results, pending, current), calls = self.install_batch(
+            [(True, "", BREW_CURRENT[0][0])], ["jq", "fd"]
+        )
+        self.assertEqual(results, {"jq": True, "fd": True})
+        self.assertEqual(pending, [])
+        self.assertEqual(current, {"jq"})
+        self.assertEqual(calls, [["brew", "install", "jq", "fd"]])
+
+    def test_retries_without_unknown_packages(self) -> None:
+        (results, pending, _), calls = self.install_batch(
+            [(False, "", BREW_MISSING[0][0]), (True, "", "")], ["jq", "jqq", "fd"]
+        )
+        self.assertEqual(results, {"jqq": False, "jq": True, "fd": True})
+        self.assertEqual(pending, [])
+        self.assertEqual(
+            calls,
+            [["brew", "install", "jq", "jqq", "fd"], ["brew", "install", "jq", "fd"]],
+        )
+
+    def test_unknown_packages_match_case_insensitively(self) -> None:
+        (results, _, _), _ = self.install_batch(
+            [(False, "", BREW_MISSING[0][0]), (True, "", "")], ["JQQ", "jq"]
+        )
+        self.assertEqual(results, {"JQQ": False, "jq": True})
+
+    def test_unexplained_failure_leaves_packages_pending(self) -> None:
+        (results, pending, _), calls = self.install_batch(
+            [(False, "", "Error: An exception occurred within a child process.\n")],
+            ["jq", "fd"],
+        )
+        self.assertEqual(results, {})
+        self.assertEqual(pending, ["jq", "fd"])
+        self.assertEqual(len(calls), 1)
+
+    def test_all_unknown(self) -> None:
+        (results, pending, _), calls = self.install_batch(
+            [(False, "", BREW_MISSING[0][0])], ["jqq"]
+        )
+        self.assertEqual(results, {"jqq": False})
+        self.assertEqual(pending, [])
+        self.assertEqual(len(calls), 1)
+
+
+class InstallManyTests(unittest.TestCase):
+    def test_brew_reports_already_installed_casks(self) -> None:
+        manager = setup.BrewManager(_installed_cache=frozenset())
+        with mock.patch.object(
+            setup, "run_cmd", return_value=(True, "", BREW_CURRENT[2][0])
+        ):
+            results = manager.install_many(["firefox", "jq"])
+        self.assertEqual(results, {"firefox": True, "jq": True})
+        self.assertTrue(manager.was_already_installed("firefox"))
+        self.assertFalse(manager.was_already_installed("jq"))
+        self.assertTrue(manager.is_installed("jq"))
+
+    def test_apt_drops_unknown_packages(self) -> None:
+        manager = setup.AptManager(_installed_cache=frozenset())
+        outputs = [
+            (False, APT_CURRENT[0][0], APT_MISSING[0][0]),
+            (True, APT_CURRENT[0][0], ""),
+        ]
+        with mock.patch.object(setup, "run_cmd", side_effect=outputs) as run_cmd:
+            results = manager.install_many(["jq", "fdd", "tmux"])
+        self.assertEqual(results, {"fdd": False, "jq": True, "tmux": True})
+        self.assertEqual(
+            run_cmd.call_args_list[-1].args[0],
+            ["sudo", "apt", "install", "-y", "jq", "tmux"],
+        )
+        self.assertTrue(manager.was_already_installed("jq"))
+        self.assertFalse(manager.was_already_installed("tmux"))
+
+    def test_fallback_doesnt_skip_packages_the_failed_batch_installed(self) -> None:
+        manager = setup.AptManager(_installed_cache=frozenset())
+        dpkg_error = APT_MISSING[2][0]
+        outputs = [
+            (False, APT_CURRENT[1][0], dpkg_error),  # batch: git, tmux, broken
+            (True, APT_CURRENT[1][0], ""),  # git was there before the batch
+            (True, "tmux is already the newest version (3.2a-4).\n", ""),
+            (False, "", dpkg_error),  # broken
+        ]
+        with mock.patch.object(setup, "run_cmd", side_effect=outputs):
+            results = manager.install_many(["git", "tmux", "broken"])
+        self.assertEqual(results, {"git": True, "tmux": True, "broken": False})
+        self.assertTrue(manager.was_already_installed("git"))
+        self.assertFalse(manager.was_already_installed("tmux"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,97 @@
+import errno
+import os
+import shutil
+import tempfile
+import unittest
+from pathlib import Path
+from unittest import mock
+
+import setup
+from utils import Platform
+
+
+class FastCopyTests(unittest.TestCase):
+    def setUp(self) -> None:
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.tmp = Path(tmp.name)
+        self.source = self.tmp / "source"
+        self.source.write_text("contents\n")
+
+    def test_copies_contents(self) -> None:
+        dest = self.tmp / "dest"
+        setup._fast_copy(self.source, dest)
+        self.assertEqual(dest.read_text(), "contents\n")
+
+    def test_falls_back_when_copy_file_range_copies_nothing(self) -> None:
+        dest = self.tmp / "dest"
+        dest.write_text("stale destination that is longer\n")
+        with mock.patch.object(os, "copy_file_range", return_value=0, create=True):
+            setup._fast_copy(self.source, dest)
+        self.assertEqual(dest.read_text(), "contents\n")
+
+    def test_falls_back_when_copy_file_range_stops_early(self) -> None:
+        dest = self.tmp / "dest"
+        with mock.patch.object(os, "copy_file_range", side_effect=[4, 0], create=True):
+            setup._fast_copy(self.source, dest)
+        self.assertEqual(dest.read_text(), "contents\n")
+
+    def test_falls_back_for_unsupported_filesystems(self) -> None:
+        dest = self.tmp / "dest"
+        error = OSError(errno.EXDEV, os.strerror(errno.EXDEV))
+        with mock.patch.object(os, "copy_file_range", side_effect=error, create=True):
+            setup._fast_copy(self.source, dest)
+        self.assertEqual(dest.read_text(), "contents\n")
+
+    @unittest.skipUnless(Path("/proc/version").exists(), "needs procfs")
+    def test_copies_files_that_report_no_size(self) -> None:
+        dest = self.tmp / "version"
+        setup._fast_copy(Path("/proc/version"), dest)
+        self.assertEqual(dest.read_text(), Path("/proc/version").read_text())
+
+
+class CopyOneTests(unittest.TestCase):
+    def setUp(self) -> None:
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.tmp = Path(tmp.name)
+        self.source = self.tmp / "source"
+        self.source.write_text("contents\n")
+        os.utime(self.source, (1_700_000_000, 1_700_000_000))
+        self.dest = self.tmp / "dest"
+
+    def copy(self) -> str:
+        mapping = setup.FileMapping(
+            source=self.source, destinations={"macos": self.dest}
+        )
+        status, _ = setup._copy_one(mapping, Platform.MACOS)
+        return status
+
+    def test_unchanged_file_is_skipped(self) -> None:
+        self.assertEqual(self.copy(), "ok")
+        self.assertEqual(self.copy(), "skip")
+
+    def test_edited_source_is_copied(self) -> None:
+        self.copy()
+        self.source.write_text("edited contents\n")
+        os.utime(self.source, (1_700_000_100, 1_700_000_100))
+        self.assertEqual(self.copy(), "ok")
+        self.assertEqual(self.dest.read_text(), "edited contents\n")
+
+    def test_same_size_with_different_mtime_is_copied(self) -> None:
+        self.copy()
+        self.dest.write_text("CONTENTS\n")
+        os.utime(self.dest, (1_700_000_100, 1_700_000_100))
+        self.assertEqual(self.copy(), "ok")
+        self.assertEqual(self.dest.read_text(), "contents\n")
+
+    def test_symlinked_destination_is_left_alone(self) -> None:
+        self.dest.symlink_to(self.source)
+        with self.assertRaises(shutil.SameFileError):
+            setup._fast_copy(self.source, self.dest)
+        self.assertNotEqual(self.copy(), "ok")
+        self.assertEqual(self.source.read_text(), "contents\n")
+
+
+if __name__ == "__main__":
+    unittest.main()
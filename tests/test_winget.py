@@ -0,0 +1,62 @@
+import unittest
+from unittest import mock
+
+import setup
+
+# `winget list` output: spinner frames, then columns padded by display width
+WINGET_LIST = [
+    "\r   - \r   \\ \r"
+    "Name                                    Id                                "
+    "Version     Available Source",
+    "-" * 102,
+    "Git                                     Git.Git                           "
+    "2.43.0      2.44.0    winget",
+    "Miniconda3 py311_23.11.0-2 (Python 3.1… Anaconda.Miniconda3               "
+    "23.11.0-2             winget",
+    "微信                                    Tencent.WeChat                    "
+    "3.9.8.25              winget",
+    "🦊 Firefox Developer Edition            Mozilla.Firefox.DeveloperEdition  "
+    "122.0b9               winget",
+    "Some App                                ARP\\Machine\\X64\\Foo Bar           1.0",
+]
+
+
+class WingetListTests(unittest.TestCase):
+    def list_installed(self, lines: list[str]) -> frozenset[str]:
+        output = iter(f"{line}\n" for line in lines)
+        with (
+            mock.patch.object(setup, "stream_cmd", return_value=output),
+            mock.patch.object(setup.WingetManager, "_cache_key", return_value=None),
+        ):
+            return setup.WingetManager().get_installed_packages()
+
+    def test_ids_are_sliced_by_display_column(self) -> None:
+        self.assertEqual(
+            self.list_installed(WINGET_LIST),
+            {
+                "git.git",
+                "anaconda.miniconda3",
+                "tencent.wechat",
+                "mozilla.firefox.developeredition",
+                "arp\\machine\\x64\\foo bar",
+            },
+        )
+
+    def test_installed_check_ignores_case(self) -> None:
+        manager = setup.WingetManager()
+        manager._installed_cache = self.list_installed(WINGET_LIST)
+        self.assertTrue(manager.is_installed("Tencent.WeChat"))
+        self.assertFalse(manager.is_installed("Tencent.QQ"))
+
+    def test_unparseable_header_lists_nothing(self) -> None:
+        self.assertEqual(self.list_installed(["Name", "-" * 10, "Git"]), frozenset())
+
+
+class SliceColumnsTests(unittest.TestCase):
+    def test_wide_characters_take_two_columns(self) -> None:
+        self.assertEqual(setup._text_width("微信 app"), 8)
+        self.assertEqual(setup._slice_columns("微信  Id.X  1.0", 6, 12), "Id.X  ")
+
+
+if __name__ == "__main__":
+    unittest.main()
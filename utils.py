@@ -1,6 +1,12 @@
+import functools
+import os
+import platform as plat
+import shlex
+import shutil
 import subprocess
+from collections.abc import Collection, Iterator
 from enum import Enum
-from typing import Protocol
+from typing import ClassVar, Protocol
 
 
 class Platform(Enum):
@@ -12,22 +18,20 @@ class Platform(Enum):
     UNKNOWN = "unknown"
 
     @classmethod
+    @functools.cache
     def detect(cls) -> "Platform":
         """Detect the current platform."""
-        if hasattr(cls, "_cached"):
-            return cls._cached  # type: ignore[return-value]
-
-        import os
-        import platform as plat
-
         result = cls.UNKNOWN
 
         if os.name == "nt":
             result = cls.WINDOWS
         elif plat.system() == "Darwin":
             result = cls.MACOS
+        elif os.environ.get("WSL_DISTRO_NAME") or os.environ.get("WSL_INTEROP"):
+            # Set by WSL in every session, no need to touch /proc
+            result = cls.WSL
         else:
-            # Check for WSL
+            # Check for WSL (the variables above don't survive e.g. sudo)
             try:
                 with open("/proc/version") as f:
                     if "microsoft" in f.read().lower():
@@ -35,7 +39,6 @@ class Platform(Enum):
             except (FileNotFoundError, PermissionError):
                 pass
 
-        cls._cached = result  # type: ignore[attr-defined]
         return result
 
     @property
@@ -53,6 +56,7 @@ class PackageManager(Protocol):
     """Protocol for package managers."""
 
     name: str
+    supports_batch_install: ClassVar[bool]
 
     def is_available(self) -> bool:
         """Check if the package manager is available on the system."""
@@ -68,29 +72,94 @@ class PackageManager(Protocol):
         """Check if a package is installed."""
         ...
 
+    def install_many(
+        self, package_ids: list[str], dry_run: bool = False
+    ) -> dict[str, bool]:
+        """Install several packages at once. Returns package_id -> success."""
+        ...
+
+    def was_already_installed(self, package_id: str) -> bool:
+        """Check if install() found the package already installed."""
+        ...
+
     def update_cache(self, dry_run: bool = False) -> None:
         """Update the package cache."""
         ...
 
-    def get_installed_packages(self) -> set[str]:
-        """Get set of installed package IDs."""
+    def get_installed_packages(
+        self, wanted: Collection[str] | None = None
+    ) -> frozenset[str]:
+        """Get set of installed package IDs, optionally only among `wanted`."""
         ...
 
 
+# Our own fds are non-inheritable anyway (PEP 446), so skipping the close pass
+# is safe on POSIX, and lets Popen use posix_spawn where it can't close fds
+# itself (macOS, glibc < 2.34). On Windows it would make every child inherit
+# the pipes of other commands running concurrently
+CLOSE_FDS = os.name == "nt"
+
+
 def run_cmd(
-    cmd: str, capture: bool = True, check: bool = False
+    cmd: list[str],
+    capture: bool = True,
+    check: bool = False,
+    extra_args: str | None = None,
 ) -> tuple[bool, str, str]:
-    """Run a shell command and return (success, stdout, stderr)."""
+    """Run a command without a shell and return (success, stdout, stderr).
+
+    `extra_args` is a user-supplied argument string appended to the command.
+    """
+    # Resolve through PATH (and PATHEXT on Windows, for .cmd/.bat shims) ourselves
+    executable = shutil.which(cmd[0])
+    if executable is None:
+        return False, "", f"{cmd[0]}: command not found"
+
+    args: list[str] | str = [executable, *cmd[1:]]
     try:
+        if extra_args and os.name == "nt":
+            # Windows programs parse their own command line, so pass the string
+            # through as written (shlex would eat the backslashes in paths)
+            args = f"{subprocess.list2cmdline(args)} {extra_args}"
+        elif extra_args:
+            args += shlex.split(extra_args)
+
         result = subprocess.run(
-            cmd,
-            shell=True,
+            args,
             capture_output=capture,
             text=True,
             check=check,
+            close_fds=CLOSE_FDS,
         )
         return result.returncode == 0, result.stdout or "", result.stderr or ""
     except subprocess.CalledProcessError as e:
         return False, e.stdout or "", e.stderr or ""
     except Exception as e:
         return False, "", str(e)
+
+
+def stream_cmd(cmd: list[str]) -> Iterator[str]:
+    """Run a command without a shell and yield its stdout line by line.
+
+    Raises OSError if the command can't be started, and CalledProcessError once
+    the output is exhausted if it exited non-zero.
+    """
+    executable = shutil.which(cmd[0])
+    if executable is None:
+        raise FileNotFoundError(f"{cmd[0]}: command not found")
+
+    with subprocess.Popen(
+        [executable, *cmd[1:]],
+        stdout=subprocess.PIPE,
+        stderr=subprocess.DEVNULL,
+        # winget writes UTF-8 whatever the console codepage; don't let one odd
+        # byte abort the listing
+        encoding="utf-8",
+        errors="replace",
+        close_fds=CLOSE_FDS,
+    ) as proc:
+        assert proc.stdout is not None
+        yield from proc.stdout
+
+    if proc.returncode != 0:
+        raise subprocess.CalledProcessError(proc.returncode, cmd)